@@ -1,18 +1,51 @@
+import uuid
+import orjson
 import streamlit as st
 from utils.exchange_rate_analyzer import ExchangeRateAnalyzer
 
+
+# The analyzed data frame is kept in session state under a data version that is unique to that
+# frame, so cached results are keyed by a short string instead of hashing the frame.
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def get_statistics(data_version):
+    return ExchangeRateAnalyzer.get_statistics(st.session_state["df"])
+
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def generate_insights(data_version):
+    return ExchangeRateAnalyzer.generate_insights(st.session_state["df"])
+
+
+# Figures are cached as resources so reruns reuse the same objects instead of rebuilding them.
+@st.cache_resource(ttl=300, max_entries=64, show_spinner=False)
+def build_figures(_analyzer, data_version):
+    df = st.session_state["df"]
+    return (_analyzer.plot_exchange_rate_trend(df), _analyzer.plot_advanced_analysis(df),
+            _analyzer.plot_conversion_over_time(df), _analyzer.plot_candlestick_chart(df))
+
+
 # Streamlit app
 st.title("Exchange Rates Analysis")
 
-# Sidebar for input
+# Sidebar for input, inside a form so the analysis only runs when the user submits it
 st.sidebar.title("Settings")
-api_key = st.sidebar.text_input("Enter your API key:", type="password")
-base_currency = st.sidebar.text_input("Enter the base currency (e.g., AUD):")
-target_currency = st.sidebar.text_input("Enter the target currency (e.g., NZD):")
+with st.sidebar.form("config"):
+    api_key = st.text_input("Enter your API key:", type="password")
+    base_currency = st.text_input("Enter the base currency (e.g., AUD):")
+    target_currency = st.text_input("Enter the target currency (e.g., NZD):")
+    submitted = st.form_submit_button("Analyze")
 
-if api_key and base_currency and target_currency:
+if submitted and api_key and base_currency and target_currency:
     analyzer = ExchangeRateAnalyzer(api_key, base_currency, target_currency)
-    df = analyzer.analyze_data()
+    st.session_state["df"] = analyzer.analyze_data()
+    st.session_state["data_version"] = uuid.uuid4().hex
+    st.session_state["analyzer"] = analyzer
+
+# Results of the last submitted analysis stay on the page across reruns, e.g. after a download
+if "analyzer" in st.session_state:
+    analyzer = st.session_state["analyzer"]
+    data_version = st.session_state["data_version"]
+    df = st.session_state["df"]
 
     if not df.empty:
         st.success("Data fetched and preprocessed successfully!")
@@ -22,7 +55,7 @@ if api_key and base_currency and target_currency:
         st.dataframe(df)
 
         # Perform data analysis
-        best_rate, worst_rate, average_rate, highest_daily_change, lowest_daily_change = analyzer.get_statistics(df)
+        best_rate, worst_rate, average_rate, highest_daily_change, lowest_daily_change = get_statistics(data_version)
 
         st.subheader("Data Analysis")
         st.write(f"**Best Exchange Rate:** {best_rate}")
@@ -33,32 +66,31 @@ if api_key and base_currency and target_currency:
 
         # Generate and display insights
         st.subheader("Insights")
-        insights = analyzer.generate_insights(df)
+        insights = generate_insights(data_version)
         for insight in insights:
             st.write(f"- {insight}")
 
+        trend_fig, advanced_fig, conversion_fig, candlestick_fig = build_figures(analyzer, data_version)
+
         # Plot exchange rates
         st.subheader("Exchange Rate Trend")
-        fig = analyzer.plot_exchange_rate_trend(df)
-        st.plotly_chart(fig)
+        st.plotly_chart(trend_fig)
 
         # Plot daily changes and moving average
         st.subheader("Daily Change and Moving Average")
-        fig = analyzer.plot_advanced_analysis(df)
-        st.plotly_chart(fig)
+        st.plotly_chart(advanced_fig)
 
         # Plot $100 conversion over time
         st.subheader("$100 Conversion Over Time (30 Days)")
-        fig = analyzer.plot_conversion_over_time(df)
-        st.plotly_chart(fig)
+        st.plotly_chart(conversion_fig)
 
         # Advanced Chart: Candlestick Chart
         st.subheader("Chart: Candlestick Chart")
-        fig = analyzer.plot_candlestick_chart(df)
-        st.plotly_chart(fig)
+        st.plotly_chart(candlestick_fig)
 
         # Save to JSON
-        json_output = df.to_json(orient='records', date_format='iso')
+        records = df.assign(Date=df["Date"].dt.strftime("%Y-%m-%d")).to_dict(orient="records")
+        json_output = orjson.dumps(records)
         st.download_button(
             label="Download data as JSON",
             data=json_output,
@@ -1,18 +1,23 @@
 import unittest
+from utils import exchange_rate_analyzer
 from utils.exchange_rate_analyzer import ExchangeRateAnalyzer
 from unittest.mock import patch
+import numpy as np
 import pandas as pd
+import requests
+import streamlit as st
 
 
 class TestExchangeRateAnalyzer(unittest.TestCase):
 
     def setUp(self):
+        st.cache_data.clear()
         self.api_key = "23a56d651d65db49fee83eb1"
         self.base_currency = "AUD"
         self.target_currency = "NZD"
         self.analyzer = ExchangeRateAnalyzer(self.api_key, self.base_currency, self.target_currency)
 
-    @patch('utils.exchange_rate_analyzer.requests.get')
+    @patch('utils.exchange_rate_analyzer.requests.Session.get')
     def test_fetch_exchange_rates_success(self, mock_get):
         mock_response = {
             "result": "success",
@@ -23,14 +28,64 @@ class TestExchangeRateAnalyzer(unittest.TestCase):
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = mock_response
 
-        rates = self.analyzer.fetch_exchange_rates()
-        self.assertTrue("NZD" in rates.values())
+        dates, rates = self.analyzer.fetch_exchange_rates()
+        self.assertEqual(len(dates), self.analyzer.days)
+        self.assertTrue((rates == 1.07).all())
 
-    @patch('utils.exchange_rate_analyzer.requests.get')
+    @patch('utils.exchange_rate_analyzer.requests.Session.get')
     def test_fetch_exchange_rates_failure(self, mock_get):
         mock_get.return_value.status_code = 403
-        rates = self.analyzer.fetch_exchange_rates()
-        self.assertEqual(rates, {})
+        dates, rates = self.analyzer.fetch_exchange_rates()
+        self.assertTrue(np.isnan(rates).all())
+
+    @patch('utils.exchange_rate_analyzer.requests.Session.get')
+    def test_switching_target_currency_reuses_history(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            "result": "success",
+            "conversion_rates": {"NZD": 1.07, "USD": 0.66}
+        }
+        dates, nzd_rates = self.analyzer.fetch_exchange_rates()
+        usd_analyzer = ExchangeRateAnalyzer(self.api_key, self.base_currency, "USD")
+        dates, usd_rates = usd_analyzer.fetch_exchange_rates()
+
+        self.assertEqual(mock_get.call_count, self.analyzer.days)
+        self.assertTrue((nzd_rates == 1.07).all())
+        self.assertTrue((usd_rates == 0.66).all())
+
+    @patch('utils.exchange_rate_analyzer.requests.Session.get')
+    def test_failed_fetch_is_not_cached(self, mock_get):
+        mock_get.return_value.status_code = 503
+        self.analyzer.fetch_exchange_rates()
+
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"result": "success", "conversion_rates": {"NZD": 1.07}}
+        dates, rates = self.analyzer.fetch_exchange_rates()
+        self.assertTrue((rates == 1.07).all())
+
+    def test_session_returns_last_response_after_retries(self):
+        retries = self.analyzer._session.get_adapter("https://v6.exchangerate-api.com").max_retries
+        self.assertFalse(retries.raise_on_status)
+        self.assertFalse(retries.respect_retry_after_header)
+        self.assertIn(503, retries.status_forcelist)
+
+    @patch('utils.exchange_rate_analyzer.st.error')
+    @patch('utils.exchange_rate_analyzer.requests.Session.get')
+    def test_request_errors_do_not_show_api_key(self, mock_get, mock_error):
+        mock_get.side_effect = requests.ConnectionError(
+            f"Max retries exceeded with url: /v6/{self.api_key}/history/AUD/2023/6/1")
+        self.analyzer.fetch_exchange_rates()
+        self.assertEqual(mock_error.call_count, self.analyzer.days)
+        for call in mock_error.call_args_list:
+            self.assertNotIn(self.api_key, call.args[0])
+            self.assertIn("ConnectionError", call.args[0])
+
+    @patch('utils.exchange_rate_analyzer.requests.Session.get')
+    def test_fetch_exchange_rates_invalid_body(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.side_effect = ValueError("not JSON")
+        dates, rates = self.analyzer.fetch_exchange_rates()
+        self.assertTrue(np.isnan(rates).all())
 
     def test_preprocess_data(self):
         df = pd.DataFrame({
@@ -46,6 +101,7 @@ class TestExchangeRateAnalyzer(unittest.TestCase):
             "Exchange Rate": [1.05, 1.07, 1.06]
         })
         df = self.analyzer.preprocess_data(df)
+        df["Daily Change"] = df["Exchange Rate"].diff()
         best_rate, worst_rate, average_rate, highest_daily_change, lowest_daily_change = self.analyzer.get_statistics(
             df)
         self.assertEqual(best_rate, 1.07)
@@ -54,6 +110,95 @@ class TestExchangeRateAnalyzer(unittest.TestCase):
         self.assertAlmostEqual(highest_daily_change, 0.02)
         self.assertAlmostEqual(lowest_daily_change, -0.01)
 
+    def assert_moving_average_matches_rolling(self):
+        rates = np.linspace(1.0, 1.3, 10)
+        dates = np.datetime64("2023-06-10", "D") - np.arange(10)
+        with patch.object(self.analyzer, "fetch_exchange_rates", return_value=(dates, rates[::-1])):
+            df = self.analyzer.analyze_data()
+        expected = pd.Series(rates).rolling(window=7).mean().to_numpy()
+        np.testing.assert_allclose(df["7-Day Moving Average"].to_numpy(), expected)
+
+    @patch('utils.exchange_rate_analyzer.move_mean', None)
+    def test_moving_average_pandas(self):
+        self.assert_moving_average_matches_rolling()
+
+    def test_moving_average_bottleneck(self):
+        if exchange_rate_analyzer.move_mean is None:
+            self.skipTest("bottleneck is not installed")
+        self.assert_moving_average_matches_rolling()
+
+    def test_plot_candlestick_chart(self):
+        df = pd.DataFrame({
+            "Date": pd.to_datetime(["2023-06-01", "2023-06-02", "2023-06-03"]),
+            "Exchange Rate": [1.05, 1.07, 1.06]
+        })
+        candlestick = self.analyzer.plot_candlestick_chart(df).data[0]
+        np.testing.assert_allclose(candlestick.open, [1.05, 1.05, 1.07])
+        np.testing.assert_allclose(candlestick.high, [1.05, 1.07, 1.07])
+        np.testing.assert_allclose(candlestick.low, [1.05, 1.05, 1.06])
+        np.testing.assert_allclose(candlestick.close, [1.05, 1.07, 1.06])
+
+
+class TestChangeStatistics(unittest.TestCase):
+
+    def setUp(self):
+        rates = pd.Series([1.05, 1.07, 1.06, 1.06, 1.20, 1.08, 1.07, 1.09, 1.08, 1.08, 1.07, 1.09])
+        self.changes = rates.diff()
+        abs_changes = self.changes.abs()
+        self.expected_count = int((abs_changes > abs_changes.mean() + 2 * abs_changes.std()).sum())
+        self.expected_volatility = self.changes.std()
+
+    def assert_matches_pandas(self, change_statistics):
+        significant_changes, volatility = change_statistics(self.changes.to_numpy())
+        self.assertEqual(significant_changes, self.expected_count)
+        self.assertAlmostEqual(volatility, self.expected_volatility)
+
+    def test_numpy_matches_pandas(self):
+        self.assertTrue(np.isnan(self.changes.iloc[0]))
+        self.assertGreater(self.expected_count, 0)
+        self.assert_matches_pandas(exchange_rate_analyzer._change_statistics_numpy)
+
+    def test_kernel_matches_pandas(self):
+        self.assert_matches_pandas(exchange_rate_analyzer._change_statistics_kernel)
+
+    def test_numba_matches_pandas(self):
+        if exchange_rate_analyzer._change_statistics_numba is None:
+            self.skipTest("numba is not installed")
+        self.assert_matches_pandas(exchange_rate_analyzer._change_statistics_numba)
+
+
+class TestDownsample(unittest.TestCase):
+
+    def test_short_series_is_unchanged(self):
+        x = np.arange(10)
+        y = np.linspace(0.0, 1.0, 10)
+        downsampled_x, downsampled_y = exchange_rate_analyzer._downsample(x, y, n_out=10)
+        self.assertIs(downsampled_x, x)
+        self.assertIs(downsampled_y, y)
+
+    def test_long_series_keeps_extremes(self):
+        x = np.arange(10000)
+        y = np.sin(x / 100.0)
+        y[1234] = 5.0
+        y[8765] = -5.0
+        downsampled_x, downsampled_y = exchange_rate_analyzer._downsample(x, y, n_out=200)
+        self.assertLessEqual(len(downsampled_y), 200)
+        self.assertIn(1234, downsampled_x)
+        self.assertIn(8765, downsampled_x)
+        self.assertEqual(downsampled_y.max(), 5.0)
+        self.assertEqual(downsampled_y.min(), -5.0)
+
+    @patch('utils.exchange_rate_analyzer.MinMaxLTTBDownsampler', None)
+    def test_leading_nan_keeps_first_bucket_extremes(self):
+        x = np.arange(10000)
+        y = np.zeros(10000)
+        y[0] = np.nan
+        y[10] = 3.0
+        y[20] = -3.0
+        downsampled_x, downsampled_y = exchange_rate_analyzer._downsample(x, y, n_out=200)
+        self.assertIn(10, downsampled_x)
+        self.assertIn(20, downsampled_x)
+
 
 if __name__ == '__main__':
     unittest.main()
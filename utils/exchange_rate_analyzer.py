@@ -1,11 +1,254 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
-from .decorators import log_function_call, time_function_execution, cache_results
+from datetime import date, timedelta
+from .decorators import instrumented
 import streamlit as st
 
+__all__ = ["ExchangeRateAnalyzer"]
+
+try:
+    from bottleneck import move_mean
+except ImportError:  # optional, pandas rolling is used instead
+    move_mean = None
+
+try:
+    from tsdownsample import MinMaxLTTBDownsampler
+except ImportError:  # optional, a NumPy min/max decimation is used instead
+    MinMaxLTTBDownsampler = None
+
+try:
+    import numba
+except ImportError:  # optional, the NumPy implementation of _change_statistics is used instead
+    numba = None
+
+# Series longer than this are downsampled before plotting
+MAX_PLOT_POINTS = 2000
+
+
+@st.cache_resource
+def _get_session():
+    """
+    Returns the requests session shared by every analyzer, so its connection pool is created once
+    per process rather than once per analyzer.
+
+    Returns
+    -------
+    requests.Session
+        The shared session.
+    """
+    session = requests.Session()
+    # Retry-After is ignored so a 429 cannot stall a worker far beyond the request timeout, and the
+    # last response is returned once retries run out so it is reported as an HTTP error
+    retries = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504],
+                    respect_retry_after_header=False, raise_on_status=False)
+    session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retries))
+    return session
+
+
+def _fetch_day(session, day_date, url):
+    """
+    Fetches the conversion rates of the base currency for a single day.
+
+    Runs on a worker thread, so errors are returned rather than reported with Streamlit.
+
+    Parameters
+    ----------
+    session : requests.Session
+        The session used to send the request.
+    day_date : datetime.date
+        The date of the rates, used in error messages.
+    url : str
+        The history endpoint URL for that date. It contains the API key, so it is never included
+        in error messages.
+
+    Returns
+    -------
+    tuple
+        A tuple of the conversion rates (or None) and an error message (or None).
+    """
+    try:
+        response = session.get(url, timeout=5)
+    except requests.RequestException as e:
+        # The exception text can include the URL, and with it the API key
+        return None, f"Request error on {day_date.isoformat()}: {type(e).__name__}"
+    if response.status_code != 200:
+        return None, f"HTTP error: {response.status_code}"
+    try:
+        data = response.json()
+        if data["result"] != "success":
+            return None, "Error fetching data: " + data.get("error-type", "unknown-error")
+        return data["conversion_rates"], None
+    except (ValueError, KeyError, TypeError) as e:
+        return None, f"Unexpected response on {day_date.isoformat()}: {type(e).__name__}"
+
+
+class HistoryFetchError(Exception):
+    """
+    Raised by _fetch_history when some days could not be fetched.
+
+    st.cache_data does not store exceptions, so incomplete histories are never cached. The partial
+    history and the error messages are carried on the exception for the caller to use.
+    """
+    def __init__(self, history, errors):
+        super().__init__("; ".join(errors))
+        self.history = history
+        self.errors = errors
+
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+@instrumented
+def _fetch_history(_session, api_key, base_currency, days, today):
+    """
+    Fetches the conversion rates of the base currency for the given number of days up to and including today.
+
+    Each history response carries the rates for every target currency, so the whole response is
+    cached by Streamlit on the hashable arguments. Reruns and changes of target currency reuse it.
+    The session is not part of the cache key. If any day fails, HistoryFetchError is raised instead
+    so that the incomplete history is not cached.
+
+    Parameters
+    ----------
+    _session : requests.Session
+        The session used to send the requests.
+    api_key : str
+        The API key for accessing the exchange rate service.
+    base_currency : str
+        The base currency code (e.g., 'AUD').
+    days : int
+        The number of days for which to fetch exchange rates.
+    today : str
+        The last date to fetch, formatted as YYYY-MM-DD.
+
+    Returns
+    -------
+    list of dict
+        The conversion rates by currency code for each day, starting with today and going back one
+        day per item.
+
+    Raises
+    ------
+    HistoryFetchError
+        If any day could not be fetched. Its history has None for those days.
+    """
+    end_date = date.fromisoformat(today)
+    url_prefix = f"https://v6.exchangerate-api.com/v6/{api_key}/history/{base_currency}"
+    requests_to_send = []
+    for i in range(days):
+        day_date = end_date - timedelta(days=i)
+        requests_to_send.append((day_date, f"{url_prefix}/{day_date.year}/{day_date.month}/{day_date.day}"))
+
+    history = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, min(days, 16))) as executor:
+        for conversion_rates, error in executor.map(lambda request: _fetch_day(_session, *request),
+                                                      requests_to_send):
+            if error:
+                errors.append(error)
+            history.append(conversion_rates)
+    if errors:
+        raise HistoryFetchError(history, errors)
+    return history
+
+
+def _downsample(x, y, n_out=MAX_PLOT_POINTS):
+    """
+    Reduces a series to about n_out points for plotting, keeping its visual shape.
+
+    Series with at most n_out points are returned unchanged.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        The x values of the series.
+    y : numpy.ndarray
+        The y values of the series.
+    n_out : int, optional
+        The number of points to keep (default is MAX_PLOT_POINTS).
+
+    Returns
+    -------
+    tuple
+        A tuple of the downsampled x and y arrays.
+    """
+    if len(y) <= n_out:
+        return x, y
+    if MinMaxLTTBDownsampler is not None and not np.isnan(y).any():
+        indices = MinMaxLTTBDownsampler().downsample(y, n_out=n_out)
+    else:
+        # Keep the minimum and maximum of each bucket, which preserves the peaks of the series
+        edges = np.linspace(0, len(y), n_out // 2 + 1).astype(int)
+        indices = []
+        for start, stop in zip(edges[:-1], edges[1:]):
+            bucket = y[start:stop]
+            if np.isnan(bucket).all():
+                continue
+            indices.extend((start + np.nanargmin(bucket), start + np.nanargmax(bucket)))
+        indices = np.unique(indices)
+    return x[indices], y[indices]
+
+
+def _change_statistics_numpy(changes):
+    """
+    Counts the significant daily changes and measures their volatility.
+
+    A change is significant when its absolute value exceeds the mean absolute change by more than
+    two standard deviations. NaN changes are ignored.
+
+    Parameters
+    ----------
+    changes : numpy.ndarray
+        The daily changes of the exchange rate.
+
+    Returns
+    -------
+    tuple
+        A tuple of the number of significant changes and the standard deviation of the changes.
+    """
+    abs_changes = np.abs(changes)
+    threshold = np.nanmean(abs_changes) + 2 * np.nanstd(abs_changes, ddof=1)
+    return int(np.sum(abs_changes > threshold)), np.nanstd(changes, ddof=1)
+
+
+def _change_statistics_kernel(changes):
+    """
+    Loop version of _change_statistics_numpy for numba to compile. It makes one pass for the mean and
+    standard deviation (Welford's algorithm) and one pass to count the significant changes.
+    """
+    count = 0
+    mean = m2 = mean_abs = m2_abs = 0.0
+    for x in changes:
+        if np.isnan(x):
+            continue
+        count += 1
+        delta = x - mean
+        mean += delta / count
+        m2 += delta * (x - mean)
+        delta = abs(x) - mean_abs
+        mean_abs += delta / count
+        m2_abs += delta * (abs(x) - mean_abs)
+    if count < 2:
+        return 0, np.nan
+    threshold = mean_abs + 2 * np.sqrt(m2_abs / (count - 1))
+    significant = 0
+    for x in changes:
+        if abs(x) > threshold:
+            significant += 1
+    return significant, np.sqrt(m2 / (count - 1))
+
+
+if numba is not None:
+    _change_statistics_numba = numba.njit(cache=True)(_change_statistics_kernel)
+    _change_statistics = _change_statistics_numba
+else:
+    _change_statistics_numba = None
+    _change_statistics = _change_statistics_numpy
+
+
 class ExchangeRateAnalyzer:
     """
     A class used to analyze exchange rates between two currencies over a specified period.
@@ -59,42 +302,37 @@ class ExchangeRateAnalyzer:
         self.base_currency = base_currency
         self.target_currency = target_currency
         self.days = days
+        self._session = _get_session()
 
-    @cache_results
-    @time_function_execution
-   # @log_function_call
     def fetch_exchange_rates(self):
         """
         Fetches exchange rates from the API for the past specified number of days.
 
         Returns
         -------
-        dict
-            A dictionary with dates as keys and exchange rates as values.
+        tuple
+            A tuple of two arrays of length days: the dates (datetime64[D]), starting with today and
+            going back one day per item, and the exchange rates on those dates (NaN where missing).
         """
-        rates = {}
-        end_date = datetime.now()
-        for i in range(self.days):
-            date = end_date - timedelta(days=i)
-            year, month, day = date.year, date.month, date.day
-            url = f"https://v6.exchangerate-api.com/v6/{self.api_key}/history/{self.base_currency}/{year}/{month}/{day}"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                if data["result"] == "success":
-                    rate = data["conversion_rates"].get(self.target_currency)
-                    if rate:
-                        rates[date.strftime("%Y-%m-%d")] = rate
-                else:
-                    st.error("Error fetching data: " + data["error-type"])
-            else:
-                st.error(f"HTTP error: {response.status_code}")
-        return rates
-
-    @cache_results
-    @time_function_execution
-    # @log_function_call
-    def preprocess_data(self, df):
+        today = date.today().isoformat()
+        try:
+            history = _fetch_history(self._session, self.api_key, self.base_currency, self.days, today)
+        except HistoryFetchError as e:
+            for error in e.errors:
+                st.error(error)
+            history = e.history
+        dates = np.datetime64(today, 'D') - np.arange(self.days)
+        rates = np.full(self.days, np.nan, dtype=np.float64)
+        for i, conversion_rates in enumerate(history):
+            if conversion_rates:
+                rate = conversion_rates.get(self.target_currency)
+                if rate:
+                    rates[i] = rate
+        return dates, rates
+
+    @staticmethod
+    @instrumented
+    def preprocess_data(df):
         """
         Preprocesses the fetched data, including handling missing values and outliers.
 
@@ -108,13 +346,12 @@ class ExchangeRateAnalyzer:
         pandas.DataFrame
             The preprocessed data frame.
         """
-        df["Date"] = pd.to_datetime(df["Date"])
-        df.dropna(inplace=True)
+        if not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+            df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d", cache=True)
+        df.dropna(subset=["Exchange Rate"], inplace=True)
         return df
 
-    @cache_results
-    @time_function_execution
-    # @log_function_call
+    @instrumented
     def analyze_data(self):
         """
         Analyzes the fetched exchange rate data and calculates additional metrics.
@@ -124,18 +361,20 @@ class ExchangeRateAnalyzer:
         pandas.DataFrame
             A data frame containing the analyzed exchange rate data with additional metrics.
         """
-        rates = self.fetch_exchange_rates()
-        df = pd.DataFrame(list(rates.items()), columns=["Date", "Exchange Rate"])
+        dates, rates = self.fetch_exchange_rates()
+        df = pd.DataFrame({"Date": dates, "Exchange Rate": rates})
         df = self.preprocess_data(df)
         df.sort_values("Date", inplace=True)
         df['Daily Change'] = df["Exchange Rate"].diff()
-        df['7-Day Moving Average'] = df["Exchange Rate"].rolling(window=7).mean()
+        if move_mean is not None and len(df) >= 7:
+            df['7-Day Moving Average'] = move_mean(df["Exchange Rate"].to_numpy(), window=7)
+        else:
+            df['7-Day Moving Average'] = df["Exchange Rate"].rolling(window=7).mean()
         return df
 
-    @cache_results
-    @time_function_execution
-    # @log_function_call
-    def get_statistics(self, df):
+    @staticmethod
+    @instrumented
+    def get_statistics(df):
         """
         Calculates statistics like the best, worst, and average exchange rates, as well as daily changes.
 
@@ -150,11 +389,14 @@ class ExchangeRateAnalyzer:
             A tuple containing the best exchange rate, worst exchange rate, average exchange rate, 
             highest daily change, and lowest daily change.
         """
-        best_rate = df["Exchange Rate"].max()
-        worst_rate = df["Exchange Rate"].min()
-        average_rate = df["Exchange Rate"].mean()
-        highest_daily_change = df["Daily Change"].max()
-        lowest_daily_change = df["Daily Change"].min()
+        rates = df["Exchange Rate"].to_numpy()
+        changes = df["Daily Change"].to_numpy()
+        best_rate = rates.max()
+        worst_rate = rates.min()
+        average_rate = rates.mean()
+        # The first daily change is NaN, as there is no previous day to compare against
+        highest_daily_change = np.nanmax(changes)
+        lowest_daily_change = np.nanmin(changes)
         return best_rate, worst_rate, average_rate, highest_daily_change, lowest_daily_change
 
     def plot_exchange_rate_trend(self, df):
@@ -171,8 +413,11 @@ class ExchangeRateAnalyzer:
         plotly.graph_objects.Figure
             A Plotly figure object representing the exchange rate trend.
         """
-        fig = px.line(df, x="Date", y="Exchange Rate",
-                      title=f"{self.base_currency} to {self.target_currency} Exchange Rate Over the Past 30 Days")
+        x, y = _downsample(df["Date"].to_numpy(), df["Exchange Rate"].to_numpy())
+        fig = go.Figure(data=[go.Scattergl(x=x, y=y, mode='lines')])
+        fig.update_layout(
+            title=f"{self.base_currency} to {self.target_currency} Exchange Rate Over the Past 30 Days",
+            xaxis_title="Date", yaxis_title="Exchange Rate")
         return fig
 
     def plot_advanced_analysis(self, df):
@@ -189,12 +434,15 @@ class ExchangeRateAnalyzer:
         plotly.graph_objects.Figure
             A Plotly figure object representing the advanced analysis.
         """
+        dates = df["Date"].to_numpy()
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df["Date"], y=df["Daily Change"], mode='lines+markers', name='Daily Change',
-                                 line=dict(color='red')))
+        x, y = _downsample(dates, df["Daily Change"].to_numpy())
+        fig.add_trace(go.Scattergl(x=x, y=y, mode='lines+markers', name='Daily Change',
+                                   line=dict(color='red')))
+        x, y = _downsample(dates, df["7-Day Moving Average"].to_numpy())
         fig.add_trace(
-            go.Scatter(x=df["Date"], y=df["7-Day Moving Average"], mode='lines+markers', name='7-Day Moving Average',
-                       line=dict(color='green')))
+            go.Scattergl(x=x, y=y, mode='lines+markers', name='7-Day Moving Average',
+                         line=dict(color='green')))
         fig.update_layout(
             title=f"Daily Change and 7-Day Moving Average of {self.base_currency} to {self.target_currency} Exchange Rate",
             xaxis_title="Date", yaxis_title="Value")
@@ -216,8 +464,12 @@ class ExchangeRateAnalyzer:
         plotly.graph_objects.Figure
             A Plotly figure object representing the conversion over time.
         """
-        df["Conversion Amount"] = initial_amount / df["Exchange Rate"]
-        fig = px.line(df, x="Date", y="Conversion Amount", title=f"${initial_amount} {self.target_currency} to {self.base_currency} Conversion Over Time (30 Days)")
+        conversion_amount = initial_amount / df["Exchange Rate"].to_numpy()
+        x, y = _downsample(df["Date"].to_numpy(), conversion_amount)
+        fig = go.Figure(data=[go.Scattergl(x=x, y=y, mode='lines')])
+        fig.update_layout(
+            title=f"${initial_amount} {self.target_currency} to {self.base_currency} Conversion Over Time (30 Days)",
+            xaxis_title="Date", yaxis_title="Conversion Amount")
         return fig
 
     def plot_candlestick_chart(self, df):
@@ -234,20 +486,24 @@ class ExchangeRateAnalyzer:
         plotly.graph_objects.Figure
             A Plotly figure object representing the candlestick chart.
         """
+        # Each day's candle opens at the previous day's rate and closes at that day's rate
+        close = df['Exchange Rate'].to_numpy()
+        open_ = np.empty_like(close)
+        open_[:1] = close[:1]
+        open_[1:] = close[:-1]
         fig = go.Figure(data=[go.Candlestick(x=df['Date'],
-                                             open=df['Exchange Rate'].shift(1).fillna(df['Exchange Rate']),
-                                             high=df['Exchange Rate'],
-                                             low=df['Exchange Rate'],
-                                             close=df['Exchange Rate'])])
+                                             open=open_,
+                                             high=np.maximum(open_, close),
+                                             low=np.minimum(open_, close),
+                                             close=close)])
         fig.update_layout(
             title=f"{self.base_currency} to {self.target_currency} Candlestick Chart Over the Past 30 Days",
             xaxis_title="Date", yaxis_title="Exchange Rate")
         return fig
 
-    @cache_results
-    @time_function_execution
-    # @log_function_call
-    def generate_insights(self, df):
+    @staticmethod
+    @instrumented
+    def generate_insights(df):
         """
         Generates insights based on the exchange rate data.
     
@@ -269,28 +525,30 @@ class ExchangeRateAnalyzer:
         - Volatility Analysis: Assesses the volatility of the exchange rate based on the standard deviation of daily changes.
         """
         insights = []
+        rates = df["Exchange Rate"].to_numpy()
+        changes = df["Daily Change"].to_numpy()
+        dates = df["Date"].to_numpy()
 
         # Trend Analysis
-        if df["Exchange Rate"].iloc[-1] > df["Exchange Rate"].iloc[0]:
+        if rates[-1] > rates[0]:
             insights.append("The exchange rate has increased over the past 30 days.")
         else:
             insights.append("The exchange rate has decreased over the past 30 days.")
 
         # Significant Changes
-        significant_changes = df[
-            df["Daily Change"].abs() > df["Daily Change"].abs().mean() + 2 * df["Daily Change"].abs().std()]
-        if not significant_changes.empty:
+        significant_changes, volatility = _change_statistics(changes)
+        if significant_changes:
             insights.append(
-                f"There were {len(significant_changes)} days with significant changes in the exchange rate.")
+                f"There were {significant_changes} days with significant changes in the exchange rate.")
 
         # Highest and Lowest Rates
-        best_rate_date = df[df["Exchange Rate"] == df["Exchange Rate"].max()]["Date"].values[0]
-        worst_rate_date = df[df["Exchange Rate"] == df["Exchange Rate"].min()]["Date"].values[0]
+        best_rate_date = dates[rates.argmax()]
+        worst_rate_date = dates[rates.argmin()]
         insights.append(f"The highest exchange rate was on {best_rate_date}.")
         insights.append(f"The lowest exchange rate was on {worst_rate_date}.")
 
         # Volatility Analysis
-        if df["Daily Change"].std() > 0.01:
+        if volatility > 0.01:
             insights.append("The exchange rate has been quite volatile.")
         else:
             insights.append("The exchange rate has been relatively stable.")